@@ -1,46 +1,63 @@
+import functools
+import logging
 import gradio as gr
-import asyncio
+import numpy as np
 import plotly.graph_objects as go
 import h3
+import h3.api.basic_int as h3_int
 from src.trackemdown.core import fetch_geotags
 
-def create_map(results):
+logger = logging.getLogger(__name__)
+
+@functools.lru_cache(maxsize=8192)
+def _boundary(cell: int) -> tuple:
+    """Hexagon boundary for an H3 cell int, cached since it never changes for a cell"""
+    return h3_int.cell_to_boundary(cell)
+
+def _hover_text(batch):
+    """Marker hover labels for each location"""
+    return [f"{addr}<br>Geotag: {geotag}" for addr, geotag in zip(batch.addresses, batch.geotags.tolist())]
+
+def create_map(batch):
     """Create an interactive map showing the geotag locations and hexagon boundaries"""
-    if not results:
+    if not batch:
         return go.Figure()
 
-    lats = [result.latitude for result in results]
-    lons = [result.longitude for result in results]
-    addresses = [result.address for result in results]
-    geotags = [result.geotag for result in results]
+    lats, lons = batch.lats, batch.lons
+    geotags = batch.geotags
 
     fig = go.Figure()
 
-    # Add hexagon boundaries for each geotag
-    colors = ['blue', 'green', 'purple', 'orange', 'brown', 'pink', 'gray', 'olive', 'cyan', 'magenta']
-
-    for i, geotag in enumerate(geotags):
+    # Draw every hexagon outline in a single trace; NaN breaks the line between polygons
+    boundaries, drawn = [], []
+    for geotag in geotags:
         try:
-            # Get hexagon boundary coordinates
-            boundary = h3.cell_to_boundary(geotag)
-
-            # Convert to lat/lon lists (boundary returns (lat, lon) tuples)
-            hex_lats = [coord[0] for coord in boundary] + [boundary[0][0]]  # Close the polygon
-            hex_lons = [coord[1] for coord in boundary] + [boundary[0][1]]
-
-            # Add hexagon outline
-            fig.add_trace(go.Scattermap(
-                lat=hex_lats,
-                lon=hex_lons,
-                mode='lines',
-                line=dict(width=2, color=colors[i % len(colors)]),
-                name=f"H3 Hexagon {i+1}",
-                hovertemplate=f'<b>H3 Geotag: {geotag}</b><extra></extra>',
-                showlegend=True
-            ))
-
+            # Get hexagon boundary coordinates (boundary returns (lat, lon) tuples)
+            boundaries.append(_boundary(h3.str_to_int(geotag)))
+            drawn.append(geotag)
         except Exception as e:
-            print(f"Could not draw hexagon for {geotag}: {e}")
+            logger.debug("Could not draw hexagon for %s: %s", geotag, e)
+
+    if boundaries:
+        # Pentagons and distorted cells have fewer/more than 6 vertices, so size
+        # rows to the largest boundary plus the closing vertex and a NaN separator
+        width = max(len(boundary) for boundary in boundaries) + 2
+        outlines = np.full((len(boundaries), width, 2), np.nan)
+        for i, boundary in enumerate(boundaries):
+            n = len(boundary)
+            outlines[i, :n] = boundary
+            outlines[i, n] = outlines[i, 0]  # Close the polygon
+
+        fig.add_trace(go.Scattermap(
+            lat=outlines[..., 0].ravel(),
+            lon=outlines[..., 1].ravel(),
+            mode='lines',
+            line=dict(width=2, color='blue'),
+            text=np.repeat(drawn, width),
+            name="H3 Hexagons",
+            hovertemplate='<b>H3 Geotag: %{text}</b><extra></extra>',
+            showlegend=True
+        ))
 
     # Add location markers
     fig.add_trace(go.Scattermap(
@@ -48,7 +65,7 @@ def create_map(results):
         lon=lons,
         mode='markers',
         marker=dict(size=8, color='red'),
-        text=[f"{addr}<br>Geotag: {geotag}" for addr, geotag in zip(addresses, geotags)],
+        text=_hover_text(batch),
         hovertemplate='<b>%{text}</b><extra></extra>',
         name="Locations",
         showlegend=True
@@ -58,7 +75,7 @@ def create_map(results):
         map=dict(
             style="open-street-map",
             zoom=2,
-            center=dict(lat=lats[0], lon=lons[0]) if lats else dict(lat=0, lon=0)
+            center=dict(lat=float(lats[0]), lon=float(lons[0]))
         ),
         height=500,
         margin=dict(l=0, r=0, t=0, b=0),
@@ -67,37 +84,47 @@ def create_map(results):
 
     return fig
 
-async def get_geotags_async(query: str, resolution: int):
+def update_map(batch, map_state):
+    """Reuse the previous figure when the hexagons are unchanged, otherwise rebuild it"""
+    geotags = batch.geotags.tolist()
+
+    if not map_state or map_state["geotags"] != geotags:
+        fig = create_map(batch)
+        return fig, {"geotags": geotags, "figure": fig}
+
+    # Same cells as last time: keep the hexagon trace and only refresh the markers and center
+    fig = map_state["figure"]
+    fig.data[-1].update(
+        lat=batch.lats,
+        lon=batch.lons,
+        text=_hover_text(batch)
+    )
+    fig.update_layout(map_center=dict(lat=float(batch.lats[0]), lon=float(batch.lons[0])))
+    return fig, map_state
+
+async def get_geotags_async(query: str, resolution: int, map_state=None):
     try:
-        results = await fetch_geotags(query, resolution)
+        batch = await fetch_geotags(query, resolution)
 
         # Format results for table display
         formatted_results = []
-        for result in results:
+        for address, lat, lon, geotag in zip(batch.addresses, batch.lats.tolist(), batch.lons.tolist(), batch.geotags.tolist()):
             formatted_results.append([
-                result.address,
-                f"{result.latitude:.6f}",
-                f"{result.longitude:.6f}",
-                result.geotag
+                address,
+                f"{lat:.6f}",
+                f"{lon:.6f}",
+                geotag
             ])
 
         # Create map
-        map_fig = create_map(results)
+        map_fig, map_state = update_map(batch, map_state)
 
-        return formatted_results, map_fig, gr.update(visible=False)
+        return formatted_results, map_fig, gr.update(visible=False), map_state
 
     except Exception as e:
         empty_fig = go.Figure()
         empty_fig.update_layout(height=400, margin=dict(l=0, r=0, t=0, b=0))
-        return [], empty_fig, gr.update(value=f"Error: {str(e)}", visible=True)
-
-def get_geotags(query: str, resolution: int):
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        return loop.run_until_complete(get_geotags_async(query, resolution))
-    finally:
-        loop.close()
+        return [], empty_fig, gr.update(value=f"Error: {str(e)}", visible=True), None
 
 # H3 Resolution levels:
 # 0: ~4,250 km hexagons (continent scale)
@@ -111,7 +138,7 @@ with gr.Blocks() as demo:
 
     with gr.Row():
         query_input = gr.Textbox(label="Address or Coordinates")
-        resolution_input = gr.Number(label="H3 Resolution", value=15, minimum=0, maximum=15)
+        resolution_input = gr.Number(label="H3 Resolution", value=15, minimum=0, maximum=15, precision=0)
 
     search_btn = gr.Button("Generate Geotags")
 
@@ -123,13 +150,15 @@ with gr.Blocks() as demo:
     )
 
     map_plot = gr.Plot(label="Map View")
+    # Last rendered figure and its geotags, so unchanged hexagons are not rebuilt
+    map_state = gr.State(None)
 
     error_output = gr.Textbox(label="Error", lines=3, interactive=False, visible=False)
 
     search_btn.click(
-        fn=get_geotags,
-        inputs=[query_input, resolution_input],
-        outputs=[results_table, map_plot, error_output]
+        fn=get_geotags_async,
+        inputs=[query_input, resolution_input, map_state],
+        outputs=[results_table, map_plot, error_output, map_state]
     )
 
 if __name__ == "__main__":
@@ -0,0 +1,88 @@
+"""Optional Numba-compiled batch wrapper around h3's Cython ``latlng_to_cell``."""
+
+import ctypes
+import importlib
+from typing import Optional
+
+import h3
+import numpy as np
+
+try:
+    import numba
+    from numba.extending import get_cython_function_address
+except ImportError:  # numba is an optional extra
+    numba = None  # type: ignore[assignment]
+
+
+# Exact capsule signature the ctypes prototype below is written against
+_EXPECTED_SIGNATURE = b"H3Index (double, double, int, int __pyx_skip_dispatch)"
+
+# (lat, lon, res) probes checked against the public h3 API before the kernel is used
+_PROBES = [(37.7749, -122.4194, 15), (48.8584, 2.2945, 9), (-33.8568, 151.2153, 0), (0.0, 0.0, 5)]
+
+
+def _capsule_signature(module_name: str, function_name: str) -> Optional[bytes]:
+    """Returns the signature string Cython stored in the function's capsule, if any."""
+    try:
+        capsule = importlib.import_module(module_name).__pyx_capi__[function_name]
+    except (ImportError, AttributeError, KeyError):
+        return None
+    get_name = ctypes.pythonapi.PyCapsule_GetName
+    get_name.restype = ctypes.c_char_p
+    get_name.argtypes = [ctypes.py_object]
+    return get_name(capsule)
+
+
+def _matches_h3(kernel) -> bool:
+    """Checks the compiled kernel against h3.latlng_to_cell on known points."""
+    for lat, lon, res in _PROBES:
+        got = kernel(np.array([lat]), np.array([lon]), res)
+        if h3.int_to_str(int(got[0])) != h3.latlng_to_cell(lat, lon, res):
+            return False
+    return True
+
+
+def _build_kernel():
+    """Binds h3's exported C function and compiles a ufunc around it, or returns None."""
+    if numba is None:
+        return None
+    try:
+        # Requires h3's Cython module to export the function via __pyx_capi__
+        addr = get_cython_function_address("h3._cy.latlng", "latlng_to_cell")
+    except (ImportError, AttributeError, KeyError, ValueError):
+        return None
+    # The binding is to a private entry point, so refuse to use it if it changed
+    if _capsule_signature("h3._cy.latlng", "latlng_to_cell") != _EXPECTED_SIGNATURE:
+        return None
+
+    # cpdef signature: H3Index (double lat, double lng, int res, int skip_dispatch)
+    functype = ctypes.CFUNCTYPE(ctypes.c_uint64, ctypes.c_double, ctypes.c_double, ctypes.c_int, ctypes.c_int)
+    c_latlng_to_cell = functype(addr)
+
+    # The Cython function is not declared nogil, so a parallel target is unsafe here.
+    @numba.vectorize(["uint64(float64, float64, int64)"], target="cpu", nopython=True)
+    def _kernel(lat, lon, res):
+        return c_latlng_to_cell(lat, lon, res, 0)
+
+    if not _matches_h3(_kernel):
+        return None
+    return _kernel
+
+
+_KERNEL = _build_kernel()
+
+
+def latlng_to_cells(lats: np.ndarray, lons: np.ndarray, resolution: int) -> Optional[np.ndarray]:
+    """
+    Converts coordinate arrays to H3 cell integers with the compiled kernel.
+
+    Returns None when the kernel is unavailable or the inputs fall outside what
+    the C function accepts, so the caller can use the regular h3 API instead
+    and get its error handling.
+    """
+    if _KERNEL is None or not 0 <= resolution <= 15:
+        return None
+    if not (np.isfinite(lats).all() and np.isfinite(lons).all()):
+        return None
+    # Callers such as gr.Number may pass whole-number floats
+    return _KERNEL(lats, lons, int(resolution))
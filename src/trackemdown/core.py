@@ -1,13 +1,169 @@
 """Core logic for fetching geotags from addresses or coordinates."""
 
-import re
-from typing import List
+import asyncio
+import logging
+import math
+import time
+import weakref
+from typing import Any, Dict, List, Optional, Tuple, Union
+import cachetools
 import httpx
 import h3
-from .models import GeoTagResult
+import h3.api.numpy_int as h3v
+import numpy as np
+import orjson
+from .models import GeoTagBatch
+from . import _h3_numba
+
+logger = logging.getLogger(__name__)
+
+def _parse_coordinates(q: str) -> Optional[Tuple[float, float]]:
+    """Parses a 'latitude,longitude' string, returning None if it is not one."""
+    parts: List[str] = q.split(",")
+    if len(parts) != 2:
+        return None
+    try:
+        # float() already ignores surrounding whitespace
+        lat: float = float(parts[0])
+        lon: float = float(parts[1])
+    except ValueError:
+        return None
+    # Comparisons are False for NaN, so it is rejected here too
+    if -90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0:
+        return lat, lon
+    return None
+
+
+def _supports_vectorized_h3() -> bool:
+    """Checks whether the installed h3 numpy backend accepts coordinate arrays."""
+    try:
+        h3v.latlng_to_cell(np.zeros(2), np.zeros(2), 0)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+_VECTORIZED_H3 = _supports_vectorized_h3()
+
+
+def _latlng_to_cells(lats: np.ndarray, lons: np.ndarray, resolution: int) -> List[str]:
+    """Converts arrays of coordinates to H3 cell strings in a single batch."""
+    cells: Optional[np.ndarray] = _h3_numba.latlng_to_cells(lats, lons, resolution)
+    if cells is None and _VECTORIZED_H3:
+        cells = h3v.latlng_to_cell(lats, lons, resolution)
+    if cells is not None:
+        return [h3.int_to_str(int(c)) for c in cells]
+    return [h3.latlng_to_cell(lat, lon, resolution) for lat, lon in zip(lats.tolist(), lons.tolist())]
+
+
+NOMINATIM_HEADERS = {'User-Agent': 'TrackEmDown/1.0 (nikhilsingh.io)'}
+
+NOMINATIM_SEARCH_URL = "https://nominatim.openstreetmap.org/search"
+
+# Nominatim usage policy allows at most one request per second
+NOMINATIM_MIN_INTERVAL = 1.0
+
+# Shared client so keep-alive reuses the TCP+TLS connection to Nominatim
+_CLIENT: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Returns the shared HTTP client, creating it if needed."""
+    global _CLIENT
+    if _CLIENT is None or _CLIENT.is_closed:
+        _CLIENT = httpx.AsyncClient(
+            http2=True,
+            headers=NOMINATIM_HEADERS,
+            timeout=10.0,
+            limits=httpx.Limits(max_keepalive_connections=20),
+        )
+    return _CLIENT
+
+
+async def close_client() -> None:
+    """Closes the shared HTTP client, if one was created."""
+    global _CLIENT
+    if _CLIENT is not None:
+        await _CLIENT.aclose()
+    _CLIENT = None
+
+
+# Raw Nominatim locations keyed on the normalized query, kept for a day
+_GEOCODE_CACHE: "cachetools.TTLCache[str, List[Dict[str, Any]]]" = cachetools.TTLCache(maxsize=10_000, ttl=86400)
+# One lock per in-flight query so concurrent misses share a single Nominatim call
+_GEOCODE_LOCKS: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+# Process-wide limiter so every lookup path shares the Nominatim rate limit
+_NOMINATIM_LOCK: Optional[asyncio.Lock] = None
+_NOMINATIM_LOCK_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_LAST_NOMINATIM_REQUEST: Optional[float] = None
+
+
+def _nominatim_lock() -> asyncio.Lock:
+    """Returns the rate-limit lock for the running event loop, creating it if needed."""
+    global _NOMINATIM_LOCK, _NOMINATIM_LOCK_LOOP
+    loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+    if _NOMINATIM_LOCK is None or _NOMINATIM_LOCK_LOOP is not loop:
+        _NOMINATIM_LOCK = asyncio.Lock()
+        _NOMINATIM_LOCK_LOOP = loop
+    return _NOMINATIM_LOCK
+
+
+def _geocode_key(q: str) -> str:
+    """Normalizes a query string for the geocode cache."""
+    return q.strip().lower()
+
+
+async def _geocode(q: str) -> List[Dict[str, Any]]:
+    """Looks up an address on Nominatim, serving repeat queries from the cache."""
+    global _LAST_NOMINATIM_REQUEST
+    key: str = _geocode_key(q)
+    try:
+        return _GEOCODE_CACHE[key]
+    except KeyError:
+        pass
+
+    lock: Optional[asyncio.Lock] = _GEOCODE_LOCKS.get(key)
+    if lock is None:
+        lock = _GEOCODE_LOCKS[key] = asyncio.Lock()
+
+    async with lock:
+        # Another task may have filled the cache while we waited
+        try:
+            return _GEOCODE_CACHE[key]
+        except KeyError:
+            pass
+
+        async with _nominatim_lock():
+            # Re-check after queueing behind other lookups
+            try:
+                return _GEOCODE_CACHE[key]
+            except KeyError:
+                pass
+
+            if _LAST_NOMINATIM_REQUEST is not None:
+                # Space requests so the next one starts no sooner than the interval
+                await asyncio.sleep(max(0.0, _LAST_NOMINATIM_REQUEST + NOMINATIM_MIN_INTERVAL - time.monotonic()))
+
+            client = get_client()
+            try:
+                # Let httpx build and escape the query string so '&' or '#' survive
+                response = await client.get(NOMINATIM_SEARCH_URL, params={'format': 'json', 'q': q})
+                response.raise_for_status()
+                locations: List[Dict[str, Any]] = orjson.loads(response.content)
+            except httpx.HTTPStatusError as exc:
+                # e.g. 429 once batches run into Nominatim's rate limit
+                raise GeocodingServiceError(f"Geocoding service returned HTTP {exc.response.status_code}")
+            except httpx.HTTPError as exc:
+                raise GeocodingServiceError(f"Error connecting to geocoding service: {exc}")
+            except orjson.JSONDecodeError as exc:
+                raise GeocodingServiceError(f"Geocoding service returned invalid JSON: {exc}")
+            finally:
+                _LAST_NOMINATIM_REQUEST = time.monotonic()
+
+        _GEOCODE_CACHE[key] = locations
+        return locations
 
-# Regex for validating "latitude,longitude" input
-COORD_REGEX = re.compile(r"^-?([1-8]?[0-9]|[1-9]0)\.{1}\d{1,15}\s*,\s*-?([1]?[0-7]?[0-9]|[1]?[1-8]?[0])\.{1}\d{1,15}$")
 
 class GeotaggingError(Exception):
     """Base exception for geotagging errors."""
@@ -25,8 +181,12 @@ class NoResultsFoundError(GeotaggingError):
     """Raised when no results are found for a query."""
     pass
 
+class InvalidResolutionError(GeotaggingError):
+    """Raised when the requested H3 resolution is outside 0-15."""
+    pass
+
 
-async def fetch_geotags(q: str, resolution: int) -> List[GeoTagResult]:
+async def fetch_geotags(q: str, resolution: int) -> GeoTagBatch:
     """
     Fetches geotag information for a given query string (address or lat,lng).
 
@@ -35,60 +195,81 @@ async def fetch_geotags(q: str, resolution: int) -> List[GeoTagResult]:
         resolution: The H3 resolution (0-15).
 
     Returns:
-        A list of GeoTagResult objects.
+        A GeoTagBatch holding one entry per location.
 
     Raises:
-        InvalidCoordinatesError: If the input coordinates are malformed.
+        InvalidResolutionError: If the resolution is outside 0-15.
+        InvalidCoordinatesError: If H3 rejects the coordinates.
         GeocodingServiceError: If there's an issue connecting to the geocoding service.
         NoResultsFoundError: If the geocoding service returns no results.
     """
-    locations = []
+    if not 0 <= resolution <= 15:
+        raise InvalidResolutionError(f"Invalid H3 resolution {resolution}. Use a value from 0 to 15.")
 
-    if COORD_REGEX.match(q.replace(" ", "")):
+    coords: Optional[Tuple[float, float]] = _parse_coordinates(q)
+    if coords is not None:
+        # Coordinates are already parsed, so build the single result directly
+        lat, lon = coords
         try:
-            lat_str, lon_str = q.split(',')
-            lat, lon = float(lat_str), float(lon_str)
-            locations.append({
-                "lat": lat,
-                "lon": lon,
-                "display_name": f"Coordinates: {lat:.6f}, {lon:.6f}"
-            })
-        except (ValueError, IndexError):
-            raise InvalidCoordinatesError("Invalid coordinate format. Use 'latitude,longitude'.")
-    else:
-        headers = {'User-Agent': 'TrackEmDown/1.0 (nikhilsingh.io)'}
-        url = f"https://nominatim.openstreetmap.org/search?format=json&q={q}"
-
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(url, headers=headers, timeout=10.0)
-                response.raise_for_status()
-                locations = response.json()
-            except httpx.RequestError as exc:
-                raise GeocodingServiceError(f"Error connecting to geocoding service: {exc}")
+            geotag: str = h3.latlng_to_cell(lat, lon, resolution)
+        except ValueError as exc:
+            # h3 domain errors subclass ValueError
+            raise InvalidCoordinatesError(f"Could not compute H3 geotag: {exc}")
+        return GeoTagBatch(
+            lats=np.array([lat]),
+            lons=np.array([lon]),
+            addresses=[f"Coordinates: {lat:.6f}, {lon:.6f}"],
+            geotags=np.array([geotag]),
+        )
+
+    locations: List[Dict[str, Any]] = await _geocode(q)
 
     if not locations:
         raise NoResultsFoundError("No results found for the given query.")
 
-    results = []
+    lat_list: List[float] = []
+    lon_list: List[float] = []
+    addresses: List[str] = []
     for loc in locations:
         try:
             lat, lon = float(loc['lat']), float(loc['lon'])
-            geotag = h3.latlng_to_cell(lat, lon, resolution)
-            results.append(
-                GeoTagResult(
-                    address=loc.get('display_name', 'N/A'),
-                    latitude=lat,
-                    longitude=lon,
-                    geotag=geotag
-                )
-            )
         except (ValueError, KeyError) as e:
             # Skip malformed results from the external API
-            print(f"Skipping a location due to parsing error: {e}")
+            logger.debug("Skipping a location due to parsing error: %s", e)
+            continue
+        if not (math.isfinite(lat) and math.isfinite(lon)):
+            logger.debug("Skipping a location with non-finite coordinates: %s, %s", lat, lon)
             continue
-    
-    if not results:
+        lat_list.append(lat)
+        lon_list.append(lon)
+        addresses.append(loc.get('display_name', 'N/A'))
+
+    if not addresses:
         raise NoResultsFoundError("Geocoding service returned malformed data.")
 
-    return results
+    lats: np.ndarray = np.array(lat_list, dtype=np.float64)
+    lons: np.ndarray = np.array(lon_list, dtype=np.float64)
+    try:
+        geotags: np.ndarray = np.array(_latlng_to_cells(lats, lons, resolution))
+    except ValueError as exc:
+        raise InvalidCoordinatesError(f"Could not compute H3 geotag: {exc}")
+
+    return GeoTagBatch(lats=lats, lons=lons, addresses=addresses, geotags=geotags)
+
+
+async def fetch_many(qs: List[str], resolution: int) -> List[Union[GeoTagBatch, BaseException]]:
+    """
+    Fetches geotags for several queries concurrently.
+
+    Coordinate queries and cached addresses run in parallel; Nominatim
+    lookups share the module-wide rate limiter in _geocode.
+
+    Args:
+        qs: Address strings or 'latitude,longitude' pairs.
+        resolution: The H3 resolution (0-15).
+
+    Returns:
+        One entry per query, in order: a GeoTagBatch on success, or the
+        exception raised for that query.
+    """
+    return await asyncio.gather(*[fetch_geotags(q, resolution) for q in qs], return_exceptions=True)
@@ -1,18 +1,65 @@
 """FastAPI application for the Geotagging Service."""
 
-from fastapi import FastAPI, HTTPException, Query
-from .models import GeoTagResponse
-from .core import fetch_geotags, NoResultsFoundError, GeocodingServiceError, InvalidCoordinatesError
+from contextlib import asynccontextmanager
+from typing import Any, List
+import msgspec
+from fastapi import Body, FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse
+from .models import BatchGeoTagItem, BatchGeoTagResponse, GeoTagResponse
+from .core import fetch_geotags, fetch_many, get_client, close_client, GeotaggingError, NoResultsFoundError, GeocodingServiceError, InvalidCoordinatesError, InvalidResolutionError
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Opens the shared geocoding client on startup and closes it on shutdown."""
+    get_client()
+    yield
+    await close_client()
+
+
+class MsgspecJSONResponse(JSONResponse):
+    """JSON response encoded straight from msgspec structs, bypassing pydantic."""
+
+    def render(self, content: Any) -> bytes:
+        return msgspec.json.encode(content)
+
+
+def _json_response(schema: dict) -> dict:
+    """OpenAPI response entry for a 200 body described by a msgspec schema."""
+    return {200: {"description": "Successful Response", "content": {"application/json": {"schema": schema}}}}
+
+
+# msgspec structs are invisible to FastAPI, so publish their JSON schemas explicitly
+(_GEOTAG_SCHEMA, _BATCH_SCHEMA), _SCHEMA_COMPONENTS = msgspec.json.schema_components(
+    [GeoTagResponse, BatchGeoTagResponse], ref_template="#/components/schemas/{name}"
+)
+
 
 app = FastAPI(
     title="Geotagging Service",
     description="An API to convert addresses and coordinates to Uber H3 geotags using OSM Nominatim.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
+_default_openapi = app.openapi
+
+
+def _openapi() -> dict:
+    """Generates the OpenAPI document with the msgspec response components merged in."""
+    if app.openapi_schema is None:
+        schema = _default_openapi()
+        schema.setdefault("components", {}).setdefault("schemas", {}).update(_SCHEMA_COMPONENTS)
+        app.openapi_schema = schema
+    return app.openapi_schema
+
+
+app.openapi = _openapi  # type: ignore[method-assign]
+
 @app.get(
     "/geotag",
-    response_model=GeoTagResponse,
+    response_class=MsgspecJSONResponse,
+    responses=_json_response(_GEOTAG_SCHEMA),
     summary="Get H3 geotag for an address or coordinates",
     tags=["Geotagging"],
 )
@@ -28,13 +75,13 @@ async def get_geotag(
     - The resulting coordinates are then converted into H3 cell identifiers (geotags).
     """
     try:
-        results = await fetch_geotags(q, resolution)
-        return GeoTagResponse(
+        batch = await fetch_geotags(q, resolution)
+        return MsgspecJSONResponse(GeoTagResponse(
             query=q,
             resolution=resolution,
-            result=results,
-        )
-    except InvalidCoordinatesError as e:
+            result=batch.to_results(),
+        ))
+    except (InvalidCoordinatesError, InvalidResolutionError) as e:
         raise HTTPException(status_code=400, detail=str(e))
     except NoResultsFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -44,6 +91,55 @@ async def get_geotag(
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {e}")
 
 
+# Nominatim allows one request per second, so this bounds an uncached batch to ~20 s
+MAX_BATCH_SIZE = 20
+
+
+@app.post(
+    "/geotag/batch",
+    response_class=MsgspecJSONResponse,
+    responses=_json_response(_BATCH_SCHEMA),
+    summary="Get H3 geotags for several addresses or coordinates",
+    tags=["Geotagging"],
+)
+async def get_geotags_batch(
+    qs: List[str] = Body(..., min_length=1, max_length=MAX_BATCH_SIZE, description="Address strings or 'latitude,longitude' pairs to look up."),
+    resolution: int = Query(12, ge=0, le=15, description="The H3 resolution (0-15). Default is 12.")
+):
+    """
+    This endpoint takes a JSON list of queries and an H3 `resolution` and returns the geotags for each.
+
+    - Coordinate queries and previously seen addresses are resolved concurrently.
+    - New addresses are geocoded one at a time to respect Nominatim's rate limit,
+      so expect roughly one second per uncached address (up to ~20 s for a full batch,
+      longer if other requests are geocoding at the same time).
+    - A failing query is reported in its own entry and does not fail the batch;
+      the top-level `status` is "success", "partial" or "error" accordingly.
+    """
+    outcomes = await fetch_many(qs, resolution)
+
+    items = []
+    for q, outcome in zip(qs, outcomes):
+        if isinstance(outcome, BaseException):
+            if isinstance(outcome, GeotaggingError):
+                detail = str(outcome)
+            else:
+                detail = f"An unexpected error occurred: {outcome}"
+            items.append(BatchGeoTagItem(query=q, status="error", detail=detail))
+        else:
+            items.append(BatchGeoTagItem(query=q, status="success", result=outcome.to_results()))
+
+    failed = sum(item.status == "error" for item in items)
+    if failed == 0:
+        status = "success"
+    elif failed == len(items):
+        status = "error"
+    else:
+        status = "partial"
+
+    return MsgspecJSONResponse(BatchGeoTagResponse(status=status, resolution=resolution, results=items))
+
+
 @app.get("/", include_in_schema=False)
 async def root():
     """Root endpoint for health check."""
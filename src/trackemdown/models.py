@@ -1,18 +1,57 @@
 """ Data models ffor the geotagging service"""
 
-from typing import List
-from pydantic import BaseModel
+from dataclasses import dataclass
+from typing import List, Optional
+import msgspec
+import numpy as np
 
-class GeoTagResult(BaseModel):
+class GeoTagResult(msgspec.Struct, frozen=True):
    """Defines the structure for a single geotag result."""
    address: str
    latitude: float
    longitude: float
    geotag: str
 
-class GeoTagResponse(BaseModel):
+class GeoTagResponse(msgspec.Struct, kw_only=True):
    """Defines the structure for a successful API response."""
    status: str = "success"
    query: str
    resolution: int
    result: List[GeoTagResult]
+
+class BatchGeoTagItem(msgspec.Struct, kw_only=True):
+   """Defines the outcome of a single query within a batch request."""
+   query: str
+   status: str
+   result: List[GeoTagResult] = msgspec.field(default_factory=list)
+   detail: Optional[str] = None
+
+class BatchGeoTagResponse(msgspec.Struct, kw_only=True):
+   """Defines the structure for a batch API response.
+
+   `status` is "success" when every query succeeded, "error" when every query
+   failed, and "partial" otherwise.
+   """
+   status: str = "success"
+   resolution: int
+   results: List[BatchGeoTagItem]
+
+@dataclass
+class GeoTagBatch:
+   """Struct-of-arrays view of geotag results, one entry per location."""
+   lats: np.ndarray
+   lons: np.ndarray
+   addresses: List[str]
+   geotags: np.ndarray
+
+   def __len__(self) -> int:
+      return len(self.addresses)
+
+   def to_results(self) -> List[GeoTagResult]:
+      """Converts the batch to a list of GeoTagResult objects for API responses."""
+      return [
+         GeoTagResult(address=address, latitude=lat, longitude=lon, geotag=geotag)
+         for address, lat, lon, geotag in zip(
+            self.addresses, self.lats.tolist(), self.lons.tolist(), self.geotags.tolist()
+         )
+      ]
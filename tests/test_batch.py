@@ -0,0 +1,92 @@
+"""Tests for Nominatim rate limiting, request coalescing and the batch endpoint."""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from trackemdown import core
+from trackemdown.main import app
+
+INTERVAL = 0.2
+
+
+class FakeNominatim:
+    """Records search requests and answers them from a canned table."""
+
+    def __init__(self, statuses=None):
+        self.calls = []
+        self.statuses = statuses or {}
+        self.client = httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        q = request.url.params["q"]
+        self.calls.append((q, time.monotonic()))
+        status = self.statuses.get(q, 200)
+        if status != 200:
+            return httpx.Response(status)
+        return httpx.Response(200, json=[{"lat": "48.8584", "lon": "2.2945", "display_name": q}])
+
+
+@pytest.fixture
+def nominatim(monkeypatch):
+    fake = FakeNominatim()
+    monkeypatch.setattr(core, "get_client", lambda: fake.client)
+    monkeypatch.setattr(core, "NOMINATIM_MIN_INTERVAL", INTERVAL)
+    monkeypatch.setattr(core, "_LAST_NOMINATIM_REQUEST", None)
+    core._GEOCODE_CACHE.clear()
+    yield fake
+    core._GEOCODE_CACHE.clear()
+
+
+def test_lookups_share_the_rate_limit(nominatim):
+    async def run():
+        await asyncio.gather(
+            core.fetch_many(["paris", "rome", "oslo"], 9),
+            core.fetch_geotags("berlin", 9),
+        )
+
+    asyncio.run(run())
+
+    times = sorted(t for _, t in nominatim.calls)
+    assert len(times) == 4
+    assert all(b - a >= INTERVAL * 0.95 for a, b in zip(times, times[1:]))
+
+
+def test_duplicate_queries_are_coalesced(nominatim):
+    async def run():
+        return await asyncio.gather(*[core.fetch_geotags(q, 9) for q in ["Paris", " paris", "PARIS "] * 2])
+
+    start = time.monotonic()
+    batches = asyncio.run(run())
+
+    assert len(nominatim.calls) == 1
+    assert len({b.geotags[0] for b in batches}) == 1
+    # Duplicates are answered from the cache without waiting out the interval
+    assert time.monotonic() - start < INTERVAL
+
+
+def test_http_status_error_is_a_geocoding_error(nominatim):
+    nominatim.statuses["busy"] = 429
+
+    with pytest.raises(core.GeocodingServiceError, match="429"):
+        asyncio.run(core.fetch_geotags("busy", 9))
+    assert "busy" not in core._GEOCODE_CACHE
+
+
+def test_batch_endpoint_reports_per_query_status(nominatim):
+    nominatim.statuses["down"] = 503
+
+    with TestClient(app) as client:
+        partial = client.post("/geotag/batch", params={"resolution": 9}, json=["1,2", "paris", "down"]).json()
+        failed = client.post("/geotag/batch", json=["down"]).json()
+        too_many = client.post("/geotag/batch", json=["1,2"] * 21)
+
+    assert partial["status"] == "partial"
+    assert [item["status"] for item in partial["results"]] == ["success", "success", "error"]
+    assert partial["results"][1]["result"][0]["address"] == "paris"
+    assert "503" in partial["results"][2]["detail"]
+    assert failed["status"] == "error"
+    assert too_many.status_code == 422